@@ -8,10 +8,25 @@ This API provides endpoints for:
 - Batch predictions
 """
 
-from fastapi import FastAPI, HTTPException
+import os
+
+# One BLAS/OpenMP thread per process (set before NumPy is imported);
+# parallelism comes from running several uvicorn workers instead (api/serve.py)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import numpy as np
+import orjson
+import pandas as pd
 import sys
 from pathlib import Path
 
@@ -20,11 +35,108 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from models.train_model import HospitalSchedulerModel
 
+# Concurrent /predict requests are coalesced into batches of up to
+# BATCH_MAX_SIZE rows, waiting at most BATCH_TIMEOUT seconds to fill one
+BATCH_MAX_SIZE = 64
+BATCH_TIMEOUT = 0.005
+
+_predict_queue = None
+_batcher_task = None
+
+
+def _set_future(future, result=None, error=None):
+    """Resolve a request future unless the client has gone away"""
+    
+    if future.done():
+        return
+    
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def _run_batcher():
+    """Collect queued /predict rows (already encoded) and predict them with one model call"""
+    
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        # Wait for the first request, then gather more until full or timed out
+        items = [await _predict_queue.get()]
+        deadline = loop.time() + BATCH_TIMEOUT
+        
+        while len(items) < BATCH_MAX_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(_predict_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        rows = [row for row, _ in items]
+        
+        # Inputs were validated and encoded by /predict, so a failure here
+        # is not specific to one request and fails the whole batch
+        try:
+            predictions = await run_in_threadpool(model.predict_rows, rows)
+        except Exception as e:
+            for _, future in items:
+                _set_future(future, error=e)
+            continue
+        
+        for (_, future), prediction in zip(items, predictions):
+            _set_future(future, result=float(prediction))
+
+
+def _load_model():
+    """Load and warm up the model (once per worker process)"""
+    
+    try:
+        model.load_model('models')
+        print("[OK] Model loaded successfully!")
+    except Exception as e:
+        print(f"[WARNING] Could not load model - {e}")
+        print("Please train the model first by running: python models/train_model.py")
+        return
+    
+    # Warm up so the first request does not pay for lazy initialization
+    # and paging in the memory-mapped model
+    try:
+        for _ in range(3):
+            model.predict_wait_time_batch(pd.DataFrame([EXAMPLE_PATIENT] * 32))
+        model.predict_one(EXAMPLE_PATIENT)
+    except Exception as e:
+        print(f"[WARNING] Model warm-up failed - {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Load the model and run the /predict batcher for the lifetime of the app"""
+    
+    global _predict_queue, _batcher_task
+    
+    # Keep a model that is already loaded (e.g. one provided by tests)
+    if model.wait_time_model is None:
+        _load_model()
+    
+    _predict_queue = asyncio.Queue()
+    _batcher_task = asyncio.create_task(_run_batcher())
+    
+    yield
+    
+    _batcher_task.cancel()
+    _batcher_task = None
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Hospital Scheduler API",
     description="AI-Powered Cloud Scheduler for Hospitals - ML Model API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -36,16 +148,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load the trained model
+# Example patient, used for the API docs and for model warm-up
+EXAMPLE_PATIENT = {
+    "arrival_hour": 14,
+    "day_of_week": "Monday",
+    "department": "Emergency",
+    "priority": "High",
+    "num_available_doctors": 5,
+    "num_available_nurses": 8,
+    "num_available_rooms": 10,
+    "current_queue_length": 15,
+    "patient_age": 45,
+    "is_weekend": 0,
+    "season": "Winter"
+}
+
+# The trained model, loaded by the lifespan handler when the app starts
 model = HospitalSchedulerModel()
 
-try:
-    model.load_model('models')
-    print("[OK] Model loaded successfully!")
-except Exception as e:
-    print(f"[WARNING] Could not load model - {e}")
-    print("Please train the model first by running: python models/train_model.py")
-
 
 # Pydantic models for request/response
 class PatientInput(BaseModel):
@@ -62,22 +182,27 @@ class PatientInput(BaseModel):
     is_weekend: int = Field(..., ge=0, le=1, description="Is weekend (0 or 1)")
     season: str = Field(..., description="Season")
     
-    class Config:
-        schema_extra = {
-            "example": {
-                "arrival_hour": 14,
-                "day_of_week": "Monday",
-                "department": "Emergency",
-                "priority": "High",
-                "num_available_doctors": 5,
-                "num_available_nurses": 8,
-                "num_available_rooms": 10,
-                "current_queue_length": 15,
-                "patient_age": 45,
-                "is_weekend": 0,
-                "season": "Winter"
-            }
-        }
+    model_config = ConfigDict(
+        extra='forbid',
+        frozen=True,
+        json_schema_extra={"example": EXAMPLE_PATIENT}
+    )
+
+
+# Column dtypes used to build input DataFrames directly from NumPy arrays
+_INPUT_DTYPES = {
+    name: np.int64 if field.annotation is int else object
+    for name, field in PatientInput.model_fields.items()
+}
+
+
+def _inputs_to_frame(input_dicts):
+    """Build an input DataFrame column by column from a list of patient dicts"""
+    n = len(input_dicts)
+    return pd.DataFrame({
+        col: np.fromiter((d[col] for d in input_dicts), dtype=dtype, count=n)
+        for col, dtype in _INPUT_DTYPES.items()
+    }, copy=False)
 
 
 class PredictionResponse(BaseModel):
@@ -147,7 +272,7 @@ async def get_model_info():
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     return {
-        "model_type": "Random Forest Regressor",
+        "model_type": "Histogram Gradient Boosting Regressor",
         "features": model.feature_columns,
         "metrics": model.metrics,
         "status": "loaded"
@@ -167,10 +292,21 @@ async def predict_wait_time(patient: PatientInput):
     
     try:
         # Convert input to dict
-        input_dict = patient.dict()
+        input_dict = patient.model_dump()
         
-        # Make prediction
-        prediction = model.predict_wait_time(input_dict)
+        # Make prediction, coalesced with concurrent requests when the batcher
+        # runs; repeated inputs are answered from the model's prediction cache
+        if _batcher_task is not None:
+            row = model.encode_row(input_dict)
+            prediction = model.cached_prediction(row)
+            
+            if prediction is None:
+                future = asyncio.get_running_loop().create_future()
+                await _predict_queue.put((row, future))
+                prediction = await future
+                model.cache_prediction(row, prediction)
+        else:
+            prediction = model.predict_wait_time(input_dict)
         
         return {
             "predicted_wait_time_minutes": round(float(prediction), 2),
@@ -193,39 +329,53 @@ async def predict_batch(patients: List[PatientInput]):
     if model.wait_time_model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    if not patients:
+        return []
+    
     try:
-        results = []
+        input_dicts = [patient.model_dump() for patient in patients]
         
-        for patient in patients:
-            input_dict = patient.dict()
-            prediction = model.predict_wait_time(input_dict)
-            
-            results.append({
+        # Predict the whole batch with a single model call, off the event loop
+        predictions = await run_in_threadpool(
+            model.predict_wait_time_batch, _inputs_to_frame(input_dicts)
+        )
+        
+        results = [
+            {
                 "predicted_wait_time_minutes": round(float(prediction), 2),
                 "input_data": input_dict,
                 "status": "success"
-            })
+            }
+            for input_dict, prediction in zip(input_dicts, predictions)
+        ]
         
-        return results
+        # Serialize directly, skipping response model re-validation
+        return ORJSONResponse(results)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
 
 
+# Static lookup lists, serialized once at import time
+_DEPARTMENTS_JSON = orjson.dumps({
+    "departments": ["Emergency", "Cardiology", "Orthopedics", "Pediatrics", "General"]
+})
+_PRIORITIES_JSON = orjson.dumps({
+    "priorities": ["Critical", "High", "Medium", "Low"]
+})
+_STATIC_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+
 @app.get("/departments")
 async def get_departments():
     """Get list of available departments"""
-    return {
-        "departments": ["Emergency", "Cardiology", "Orthopedics", "Pediatrics", "General"]
-    }
+    return Response(_DEPARTMENTS_JSON, media_type="application/json", headers=_STATIC_CACHE_HEADERS)
 
 
 @app.get("/priorities")
 async def get_priorities():
     """Get list of priority levels"""
-    return {
-        "priorities": ["Critical", "High", "Medium", "Low"]
-    }
+    return Response(_PRIORITIES_JSON, media_type="application/json", headers=_STATIC_CACHE_HEADERS)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+"""
+Production entrypoint for the Hospital Scheduler API
+
+Runs api.main:app under uvicorn with API_WORKERS worker processes (default 1;
+match it to the CPU limit of the container). With several workers, the tree
+node arrays are exported to shared memory first so all workers share one copy.
+
+Usage: python -m api.serve
+"""
+
+import os
+
+# One BLAS/OpenMP thread per process (set before NumPy is imported and
+# inherited by the workers); parallelism comes from the workers instead
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import sys
+from pathlib import Path
+
+import uvicorn
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.train_model import HospitalSchedulerModel
+
+
+def main():
+    """Export the model to shared memory and run the uvicorn workers"""
+    
+    workers = int(os.environ.get("API_WORKERS", "1"))
+    host = os.environ.get("API_HOST", "0.0.0.0")
+    port = int(os.environ.get("API_PORT", "8000"))
+    
+    # Let all workers share one copy of the tree arrays
+    model = HospitalSchedulerModel()
+    shm = None
+    if workers > 1:
+        try:
+            model.load_model('models')
+            shm = model.export_to_shm(f"hospital_scheduler_{os.getpid()}")
+        except Exception as e:
+            print(f"[WARNING] Could not export model to shared memory - {e}")
+    
+    try:
+        uvicorn.run("api.main:app", host=host, port=port, workers=workers)
+    finally:
+        if shm is not None:
+            model.release_shm(shm)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Machine Learning Model for Hospital Scheduling
 This module implements the ML model for predicting patient wait times
 and classifying patient priority. It includes:
 - Data preprocessing
-- Model training (Random Forest Regressor)
+- Model training (Histogram Gradient Boosting Regressor)
 - Model evaluation
 - Model saving/loading
 - Feature importance analysis
@@ -13,9 +13,18 @@ and classifying patient priority. It includes:
 import pandas as pd
 import numpy as np
 import joblib
+import importlib.util
 import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
+from sklearn.ensemble import HistGradientBoostingRegressor, GradientBoostingClassifier
+from sklearn.inspection import permutation_importance
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 from sklearn.metrics import classification_report, accuracy_score
@@ -23,18 +32,34 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 
+# Optional multithreaded CSV parsing (checked without importing pyarrow;
+# the optional ONNX packages are likewise only imported where used)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Number of single-row predictions kept in the per-model LRU cache
+PREDICTION_CACHE_SIZE = 8192
+
 
 class HospitalSchedulerModel:
     """ML Model for hospital scheduling predictions"""
     
-    def __init__(self):
+    def __init__(self, max_iter=200):
+        self.max_iter = max_iter
         self.wait_time_model = None
+        self.ort_sess = None
+        self._shm = None
         self.priority_classifier = None
         self.label_encoders = {}
         self.scaler = StandardScaler()
         self.feature_columns = None
         self.metrics = {}
-        
+        self._encoder_maps = {}
+        self._feature_order = []
+        self._categorical_set = set()
+        self._prediction_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+    
     def preprocess_data(self, df):
         """Preprocess the dataset for training"""
         
@@ -47,32 +72,82 @@ class HospitalSchedulerModel:
         categorical_cols = ['day_of_week', 'department', 'priority', 'season']
         
         for col in categorical_cols:
-            if col not in self.label_encoders:
+            column = df_processed[col]
+            
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # Encode only the category list, then index it with the codes
+                # (declared but unused categories must not become labels)
+                column = column.cat.remove_unused_categories()
+                
+                if col not in self.label_encoders:
+                    self.label_encoders[col] = LabelEncoder().fit(column.cat.categories)
+                
+                codes = column.cat.codes.to_numpy()
+                if (codes < 0).any():
+                    raise ValueError(f"Column '{col}' contains missing values")
+                
+                df_processed[col] = self.label_encoders[col].transform(column.cat.categories)[codes]
+            elif col not in self.label_encoders:
                 self.label_encoders[col] = LabelEncoder()
-                df_processed[col] = self.label_encoders[col].fit_transform(df_processed[col])
+                df_processed[col] = self.label_encoders[col].fit_transform(column)
             else:
-                df_processed[col] = self.label_encoders[col].transform(df_processed[col])
+                df_processed[col] = self.label_encoders[col].transform(column)
         
         return df_processed
     
+    def _prepare_inference(self):
+        """Precompute lookup tables used on the inference path"""
+        
+        # Label -> code tables from the fitted encoders
+        self._encoder_maps = {
+            col: {label: code for code, label in enumerate(le.classes_)}
+            for col, le in self.label_encoders.items()
+        }
+        
+        # Feature order for building single rows directly
+        self._feature_order = list(self.feature_columns)
+        self._categorical_set = set(self._encoder_maps)
+        
+        # Fresh per-model cache of single-row predictions
+        with self._cache_lock:
+            self._prediction_cache = OrderedDict()
+            self.cache_hits = 0
+    
+    def preprocess_data_inplace(self, df):
+        """Encode new data for inference in place using the precomputed lookup tables"""
+        
+        # Encode categorical variables with plain dict lookups
+        for col, mapping in self._encoder_maps.items():
+            encoded = df[col].map(mapping)
+            
+            if encoded.isna().any():
+                unseen = df[col][encoded.isna()].unique().tolist()
+                raise ValueError(f"y contains previously unseen labels: {unseen}")
+            
+            df[col] = encoded.astype(np.int32)
+        
+        return df
+    
     def train_wait_time_model(self, X_train, y_train, X_test, y_test):
         """Train the wait time prediction model (Regression)"""
         
         print("\n=== Training Wait Time Prediction Model ===")
         
-        # Initialize Random Forest Regressor
-        self.wait_time_model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=20,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
+        # Initialize Histogram Gradient Boosting Regressor
+        self.wait_time_model = HistGradientBoostingRegressor(
+            max_iter=self.max_iter,
+            max_depth=6,
+            learning_rate=0.05,
+            early_stopping=True,
+            random_state=42
         )
         
         # Train the model
-        print("Training Random Forest Regressor...")
+        print("Training Histogram Gradient Boosting Regressor...")
         self.wait_time_model.fit(X_train, y_train)
+        self.ort_sess = None
+        
+        print(f"Boosting iterations: {self.wait_time_model.n_iter_}")
         
         # Make predictions
         y_pred_train = self.wait_time_model.predict(X_train)
@@ -102,27 +177,39 @@ class HospitalSchedulerModel:
         print(f"Training R²: {train_r2:.4f}")
         print(f"Testing R²: {test_r2:.4f}")
         
+        # Permutation importance on the test set (HGBT has no feature_importances_)
+        importance = permutation_importance(
+            self.wait_time_model, X_test, y_test, n_repeats=5, random_state=42, n_jobs=-1
+        )
+        self.metrics['feature_importance'] = {
+            feature: float(value)
+            for feature, value in zip(self.feature_columns, importance.importances_mean)
+        }
+        
         return self.wait_time_model
     
     def get_feature_importance(self, feature_names):
         """Get feature importance from the trained model"""
         
-        if self.wait_time_model is None:
+        if self.wait_time_model is None or 'feature_importance' not in self.metrics:
             return None
         
-        importance = self.wait_time_model.feature_importances_
+        importance = self.metrics['feature_importance']
         feature_importance = pd.DataFrame({
             'feature': feature_names,
-            'importance': importance
+            'importance': [importance[feature] for feature in feature_names]
         }).sort_values('importance', ascending=False)
         
         return feature_importance
     
-    def train(self, data_path, test_size=0.2):
-        """Complete training pipeline"""
+    def train(self, data, test_size=0.2):
+        """Complete training pipeline (data is a CSV path or a DataFrame)"""
         
         print("Loading data...")
-        df = pd.read_csv(data_path)
+        if isinstance(data, pd.DataFrame):
+            df = data
+        else:
+            df = pd.read_csv(data, engine='pyarrow' if HAS_PYARROW else 'c')
         
         print(f"Dataset shape: {df.shape}")
         
@@ -135,7 +222,7 @@ class HospitalSchedulerModel:
         
         self.feature_columns = [col for col in df_processed.columns if col not in exclude_cols]
         
-        X = df_processed[self.feature_columns]
+        X = df_processed[self.feature_columns].to_numpy(dtype=np.float32)
         y = df_processed[target_col]
         
         # Split data
@@ -148,6 +235,7 @@ class HospitalSchedulerModel:
         
         # Train wait time model
         self.train_wait_time_model(X_train, y_train, X_test, y_test)
+        self._prepare_inference()
         
         # Get feature importance
         feature_importance = self.get_feature_importance(self.feature_columns)
@@ -157,64 +245,220 @@ class HospitalSchedulerModel:
         return self.metrics
     
     def predict_wait_time(self, input_data):
-        """Predict wait time for new data"""
+        """Predict wait time for new data (DataFrames are encoded in place)"""
         
         if self.wait_time_model is None:
             raise ValueError("Model not trained yet!")
         
-        # Ensure input is DataFrame
+        # Single inputs skip DataFrame construction entirely
         if isinstance(input_data, dict):
-            input_data = pd.DataFrame([input_data])
+            return self.predict_one(input_data)
         
         # Preprocess
-        input_processed = self.preprocess_data(input_data)
+        input_processed = self.preprocess_data_inplace(input_data)
         
         # Select features
-        X = input_processed[self.feature_columns]
+        X = input_processed[self.feature_columns].to_numpy(dtype=np.float32, copy=False)
         
         # Predict
-        prediction = self.wait_time_model.predict(X)
+        prediction = self._predict_array(X)
         
         return prediction[0] if len(prediction) == 1 else prediction
     
+    def predict_one(self, input_data):
+        """Predict wait time for a single input dict without building a DataFrame"""
+        
+        if self.wait_time_model is None:
+            raise ValueError("Model not trained yet!")
+        
+        row = self.encode_row(input_data)
+        
+        # Predict, reusing earlier results for identical inputs
+        prediction = self.cached_prediction(row)
+        if prediction is None:
+            X = np.array(row, dtype=np.float32)[None, :]
+            prediction = float(self._predict_array(X)[0])
+            self.cache_prediction(row, prediction)
+        
+        return prediction
+    
+    def encode_row(self, input_data):
+        """Encode a single input dict as a hashable tuple in training column order"""
+        
+        row = []
+        
+        for col in self._feature_order:
+            value = input_data[col]
+            
+            if col in self._categorical_set:
+                if value not in self._encoder_maps[col]:
+                    raise ValueError(f"y contains previously unseen labels: {[value]}")
+                value = self._encoder_maps[col][value]
+            
+            row.append(value)
+        
+        return tuple(row)
+    
+    def predict_rows(self, rows):
+        """Predict a list of rows encoded by encode_row with a single model call"""
+        
+        if self.wait_time_model is None:
+            raise ValueError("Model not trained yet!")
+        
+        return self._predict_array(np.array(rows, dtype=np.float32))
+    
+    def cached_prediction(self, row):
+        """Look up the cached prediction for an encoded row (None on a miss)"""
+        
+        with self._cache_lock:
+            prediction = self._prediction_cache.get(row)
+            
+            if prediction is not None:
+                self._prediction_cache.move_to_end(row)
+                self.cache_hits += 1
+        
+        return prediction
+    
+    def cache_prediction(self, row, prediction):
+        """Store the prediction for an encoded row, evicting the least recently used"""
+        
+        with self._cache_lock:
+            self._prediction_cache[row] = float(prediction)
+            self._prediction_cache.move_to_end(row)
+            
+            if len(self._prediction_cache) > PREDICTION_CACHE_SIZE:
+                self._prediction_cache.popitem(last=False)
+    
+    def predict_wait_time_batch(self, input_data):
+        """Predict wait times for a batch of inputs with a single model call
+        
+        The categorical columns of input_data are encoded in place.
+        """
+        
+        if self.wait_time_model is None:
+            raise ValueError("Model not trained yet!")
+        
+        # Preprocess the whole batch at once
+        input_processed = self.preprocess_data_inplace(input_data)
+        
+        # Select features as float32 (the ONNX input dtype)
+        X = input_processed[self.feature_columns].to_numpy(dtype=np.float32, copy=False)
+        
+        # Predict
+        return self._predict_array(X)
+    
+    def _predict_array(self, X):
+        """Run the model on a float32 feature array, via ONNX Runtime when loaded"""
+        
+        if self.ort_sess is not None:
+            return self.ort_sess.run(None, {'X': X})[0].ravel()
+        
+        return self.wait_time_model.predict(X)
+    
     def save_model(self, model_dir='models'):
-        """Save the trained model and encoders"""
+        """Save the trained model and encoders (to a directory or a binary file object)"""
+        
+        # File objects get everything as a single joblib bundle
+        if hasattr(model_dir, 'write'):
+            joblib.dump({
+                'wait_time_model': self.wait_time_model,
+                'label_encoders': self.label_encoders,
+                'feature_columns': self.feature_columns,
+                'metrics': self.metrics
+            }, model_dir)
+            return
         
         model_dir = Path(model_dir)
         model_dir.mkdir(exist_ok=True)
         
         print(f"\nSaving model to {model_dir}...")
         
-        # Save the model
-        joblib.dump(self.wait_time_model, model_dir / 'wait_time_model.pkl')
+        # Every file is written to a temporary name and renamed into place, so
+        # processes that memory-mapped the previous model keep valid pages
+        
+        # Save the model (uncompressed, so load_model can memory-map it)
+        with _replace_on_close(model_dir / 'wait_time_model.pkl') as f:
+            joblib.dump(self.wait_time_model, f)
+        
+        # Export an ONNX copy of the model for onnxruntime serving,
+        # never leaving a stale export next to a newer model
+        onnx_path = model_dir / 'wait_time.onnx'
+        onnx_path.unlink(missing_ok=True)
+        try:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            convert_sklearn = None
+        
+        if convert_sklearn is not None:
+            try:
+                onx = convert_sklearn(
+                    self.wait_time_model,
+                    initial_types=[('X', FloatTensorType([None, len(self.feature_columns)]))]
+                )
+                with _replace_on_close(onnx_path) as f:
+                    f.write(onx.SerializeToString())
+            except Exception as e:
+                # Converter errors can embed the whole tree ensemble; keep the first line
+                summary = next(iter(str(e).splitlines()), '')[:120]
+                print(f"[WARNING] Could not export ONNX model - {type(e).__name__}: {summary}")
         
         # Save encoders
-        joblib.dump(self.label_encoders, model_dir / 'label_encoders.pkl')
+        with _replace_on_close(model_dir / 'label_encoders.pkl') as f:
+            joblib.dump(self.label_encoders, f)
         
         # Save feature columns
-        joblib.dump(self.feature_columns, model_dir / 'feature_columns.pkl')
+        with _replace_on_close(model_dir / 'feature_columns.pkl') as f:
+            joblib.dump(self.feature_columns, f)
         
         # Save metrics
-        with open(model_dir / 'metrics.json', 'w') as f:
+        with _replace_on_close(model_dir / 'metrics.json', 'w') as f:
             json.dump(self.metrics, f, indent=2)
         
         print("[OK] Model saved successfully!")
     
     def load_model(self, model_dir='models'):
-        """Load a trained model"""
+        """Load a trained model (from a directory or a binary file object)"""
+        
+        # File objects hold a single bundle written by save_model
+        if hasattr(model_dir, 'read'):
+            bundle = joblib.load(model_dir)
+            self.wait_time_model = bundle['wait_time_model']
+            self.ort_sess = None
+            self._shm = None
+            self.label_encoders = bundle['label_encoders']
+            self.feature_columns = bundle['feature_columns']
+            self.metrics = bundle['metrics']
+            self._prepare_inference()
+            return self
         
         model_dir = Path(model_dir)
         
         print(f"Loading model from {model_dir}...")
         
-        # Load the model
-        self.wait_time_model = joblib.load(model_dir / 'wait_time_model.pkl')
+        # Load the model, memory-mapping its arrays so worker processes
+        # share the same pages (requires an uncompressed pickle)
+        self.wait_time_model = joblib.load(model_dir / 'wait_time_model.pkl', mmap_mode='r')
+        self._attach_shm(model_dir)
+        
+        # Serve through onnxruntime when an ONNX export is available
+        self.ort_sess = None
+        onnx_path = model_dir / 'wait_time.onnx'
+        if onnx_path.exists() and importlib.util.find_spec("onnxruntime") is not None:
+            import onnxruntime as ort
+            
+            sess_options = ort.SessionOptions()
+            sess_options.intra_op_num_threads = 1
+            self.ort_sess = ort.InferenceSession(
+                str(onnx_path), sess_options, providers=['CPUExecutionProvider']
+            )
         
         # Load encoders
         self.label_encoders = joblib.load(model_dir / 'label_encoders.pkl')
         
         # Load feature columns
         self.feature_columns = joblib.load(model_dir / 'feature_columns.pkl')
+        self._prepare_inference()
         
         # Load metrics
         with open(model_dir / 'metrics.json', 'r') as f:
@@ -223,6 +467,138 @@ class HospitalSchedulerModel:
         print("[OK] Model loaded successfully!")
         
         return self
+    
+    def _tree_predictors(self):
+        """Flat list of the boosted trees (sklearn-internal TreePredictor objects)"""
+        
+        return [predictor for iteration in self.wait_time_model._predictors for predictor in iteration]
+    
+    def export_to_shm(self, shm_prefix, model_dir='models'):
+        """Copy the tree node arrays into one shared memory segment
+        
+        Worker processes that load the model from model_dir afterwards use
+        views over the segment instead of private copies. The caller owns
+        the returned segment and must pass it to release_shm when done.
+        """
+        
+        model_dir = Path(model_dir)
+        predictors = self._tree_predictors()
+        
+        shm = SharedMemory(
+            name=f'{shm_prefix}_nodes', create=True,
+            size=max(sum(p.nodes.nbytes for p in predictors), 1)
+        )
+        
+        # Pack the node arrays back to back, recording where each one starts
+        trees = []
+        offset = 0
+        for predictor in predictors:
+            nodes = predictor.nodes
+            np.ndarray(nodes.shape, dtype=nodes.dtype, buffer=shm.buf, offset=offset)[:] = nodes
+            trees.append([offset, len(nodes)])
+            offset += nodes.nbytes
+        
+        with open(model_dir / 'shm_manifest.json', 'w') as f:
+            json.dump({
+                'name': shm.name,
+                'trees': trees,
+                'model_stamp': _model_stamp(model_dir),
+                'tracker': _resource_tracker_id()
+            }, f)
+        
+        print(f"[OK] Exported {len(trees)} trees to shared memory '{shm.name}'")
+        
+        return shm
+    
+    def release_shm(self, shm, model_dir='models'):
+        """Remove a segment created by export_to_shm and its manifest"""
+        
+        (Path(model_dir) / 'shm_manifest.json').unlink(missing_ok=True)
+        shm.close()
+        shm.unlink()
+    
+    def _attach_shm(self, model_dir):
+        """Point the tree node arrays at a segment exported by another process"""
+        
+        self._shm = None
+        manifest_path = model_dir / 'shm_manifest.json'
+        if not manifest_path.exists():
+            return
+        
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        
+        # Ignore manifests left over from a different model (a retrained
+        # model can have the same tree sizes, so compare the pickle too)
+        predictors = self._tree_predictors()
+        if manifest.get('model_stamp') != _model_stamp(model_dir):
+            return
+        if [len(p.nodes) for p in predictors] != [count for _, count in manifest['trees']]:
+            return
+        
+        # The exporting process owns the segment; don't unlink it when we exit
+        try:
+            if sys.version_info >= (3, 13):
+                shm = SharedMemory(name=manifest['name'], track=False)
+            else:
+                shm = SharedMemory(name=manifest['name'])
+                
+                # Attaching registers the segment with our resource tracker. Spawned
+                # workers share the exporter's tracker, where unregistering would drop
+                # the exporter's own registration, so only undo it in a separate tracker
+                if manifest.get('tracker') != _resource_tracker_id():
+                    resource_tracker.unregister(shm._name, 'shared_memory')
+        except FileNotFoundError:
+            return
+        
+        for predictor, (offset, count) in zip(predictors, manifest['trees']):
+            nodes = np.ndarray((count,), dtype=predictor.nodes.dtype, buffer=shm.buf, offset=offset)
+            nodes.flags.writeable = False
+            predictor.nodes = nodes
+        
+        # Keep the mapping alive as long as the model uses it
+        self._shm = shm
+
+
+@contextmanager
+def _replace_on_close(path, mode='wb'):
+    """Open a temporary file next to path and rename it over path when done
+    
+    The rename gives path a new inode, so existing memory maps of the old
+    file stay intact. On error the temporary file is removed instead.
+    """
+    
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _model_stamp(model_dir):
+    """Identify the saved model pickle by its modification time and size"""
+    
+    stat = (Path(model_dir) / 'wait_time_model.pkl').stat()
+    
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _resource_tracker_id():
+    """Identify this process's resource tracker by its pipe (None where unused)
+    
+    Processes spawned by multiprocessing inherit the parent's tracker pipe,
+    so equal ids mean the processes share one tracker.
+    """
+    
+    if os.name != 'posix':
+        return None
+    
+    resource_tracker.ensure_running()
+    
+    return os.fstat(resource_tracker._resource_tracker._fd).st_ino
 
 
 def main():
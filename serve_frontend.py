@@ -3,7 +3,7 @@ Simple HTTP server to serve the frontend
 """
 
 import http.server
-import socketserver
+import io
 import os
 
 PORT = 3000
@@ -19,9 +19,30 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
+    
+    if hasattr(os, "sendfile"):
+        def copyfile(self, source, outputfile):
+            # Send files straight from the kernel with sendfile (Linux/macOS)
+            try:
+                in_fd = source.fileno()
+                out_fd = outputfile.fileno()
+            except (AttributeError, io.UnsupportedOperation):
+                # In-memory bodies such as directory listings
+                return super().copyfile(source, outputfile)
+            
+            outputfile.flush()
+            offset = source.tell()
+            size = os.fstat(in_fd).st_size
+            
+            while offset < size:
+                sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
 
 if __name__ == "__main__":
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+    # One thread per request (daemon threads, so Ctrl+C exits immediately)
+    with http.server.ThreadingHTTPServer(("", PORT), MyHTTPRequestHandler) as httpd:
         print(f"Serving frontend at http://localhost:{PORT}")
         print(f"Open your browser to: http://localhost:{PORT}/index.html")
         print("Press Ctrl+C to stop the server")
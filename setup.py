@@ -6,6 +6,7 @@ Runs all necessary setup steps in sequence
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def run_command(command, description):
@@ -14,20 +15,20 @@ def run_command(command, description):
     print(f"  {description}")
     print(f"{'='*60}\n")
     
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error: {e}")
-        print(f"Output: {e.output}")
+    # Stream output live instead of buffering it until the command exits
+    sys.stdout.flush()
+    process = subprocess.Popen(command, shell=True)
+    
+    if process.wait() != 0:
+        print(f"❌ Error: Command '{command}' returned non-zero exit status {process.returncode}.")
         return False
+    
+    return True
+
+def prepare_directories():
+    """Create the output directories used by the setup steps"""
+    for directory in ('data', 'models'):
+        Path(directory).mkdir(exist_ok=True)
 
 def main():
     """Main setup process"""
@@ -39,19 +40,25 @@ def main():
     ╚══════════════════════════════════════════════════════════╝
     """)
     
-    # Step 1: Generate dataset
-    print("\n📊 Step 1/3: Generating hospital scheduling dataset...")
-    if not run_command(
-        f"{sys.executable} data/generate_data.py",
-        "Generating synthetic hospital data"
-    ):
-        print("⚠️  Dataset generation failed, but continuing...")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Prepare output directories while the dataset is generated
+        directories_ready = executor.submit(prepare_directories)
+        
+        # Step 1: Generate dataset
+        print("\n📊 Step 1/3: Generating hospital scheduling dataset...")
+        if not run_command(
+            f"{sys.executable} data/generate_data.py",
+            "Generating synthetic hospital data"
+        ):
+            print("⚠️  Dataset generation failed, but continuing...")
+        
+        directories_ready.result()
     
     # Step 2: Train model
     print("\n🤖 Step 2/3: Training machine learning model...")
     if not run_command(
         f"{sys.executable} models/train_model.py",
-        "Training Random Forest model"
+        "Training Gradient Boosting model"
     ):
         print("❌ Model training failed. Please check the errors above.")
         return False
@@ -67,13 +74,10 @@ def main():
         'models/metrics.json'
     ]
     
-    all_exist = True
-    for file in model_files:
-        if Path(file).exists():
-            print(f"✓ {file} exists")
-        else:
-            print(f"✗ {file} missing")
-            all_exist = False
+    file_exists = {file: Path(file).exists() for file in model_files}
+    for file, exists in file_exists.items():
+        print(f"✓ {file} exists" if exists else f"✗ {file} missing")
+    all_exist = all(file_exists.values())
     
     if all_exist:
         print("""
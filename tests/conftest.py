@@ -0,0 +1,32 @@
+"""
+Shared pytest configuration
+"""
+
+import numpy as np
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", default=False, help="Run tests marked as slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: slow test, only run with --runslow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    
+    skip_slow = pytest.mark.skip(reason="Slow test, run with --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _warmup_sklearn():
+    """Import sklearn and run a tiny fit once so OpenMP/BLAS start up before the tests"""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    
+    HistGradientBoostingRegressor(max_iter=2).fit(np.zeros((4, 2)), np.zeros(4))
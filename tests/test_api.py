@@ -3,18 +3,45 @@ Integration tests for the FastAPI application
 """
 
 import pytest
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
-import sys
-from pathlib import Path
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
-
-from api.main import app
+import api.main
+from api.main import app, EXAMPLE_PATIENT
+from models.train_model import HospitalSchedulerModel
 
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module")
+def small_model():
+    """Train a small model on random patients"""
+    rng = np.random.default_rng(0)
+    n = 200
+    
+    df = pd.DataFrame({
+        "arrival_hour": rng.integers(0, 24, n),
+        "day_of_week": rng.choice(["Monday", "Tuesday", "Saturday"], n),
+        "department": rng.choice(["Emergency", "Cardiology", "General"], n),
+        "priority": rng.choice(["Critical", "High", "Medium", "Low"], n),
+        "num_available_doctors": rng.integers(1, 10, n),
+        "num_available_nurses": rng.integers(2, 15, n),
+        "num_available_rooms": rng.integers(1, 20, n),
+        "current_queue_length": rng.integers(0, 40, n),
+        "patient_age": rng.integers(0, 90, n),
+        "is_weekend": rng.integers(0, 2, n),
+        "season": rng.choice(["Winter", "Summer"], n)
+    })
+    df["wait_time_minutes"] = 10 + 2 * df["current_queue_length"] + rng.normal(0, 3, n)
+    
+    model = HospitalSchedulerModel(max_iter=20)
+    model.train(df)
+    
+    return model
+
+
 class TestAPIEndpoints:
     """Test API endpoints"""
     
@@ -42,6 +69,7 @@ class TestAPIEndpoints:
         data = response.json()
         assert "departments" in data
         assert len(data["departments"]) > 0
+        assert "max-age" in response.headers["cache-control"]
     
     def test_get_priorities(self):
         """Test priorities endpoint"""
@@ -50,6 +78,7 @@ class TestAPIEndpoints:
         data = response.json()
         assert "priorities" in data
         assert len(data["priorities"]) > 0
+        assert "max-age" in response.headers["cache-control"]
 
 
 class TestPredictionEndpoint:
@@ -109,6 +138,86 @@ class TestPredictionEndpoint:
             data = response.json()
             assert isinstance(data, list)
             assert len(data) == 2
+    
+    def test_batch_prediction_invalid_item(self, valid_patient_data):
+        """Test batch validation errors point at the failing item"""
+        batch_data = [valid_patient_data, dict(valid_patient_data, arrival_hour=25)]
+        
+        response = client.post("/predict/batch", json=batch_data)
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", 1, "arrival_hour"]
+    
+    def test_batch_prediction_schema(self):
+        """Test the batch request body is documented as a list of patients"""
+        schema = app.openapi()["paths"]["/predict/batch"]["post"]["requestBody"]
+        items = schema["content"]["application/json"]["schema"]["items"]
+        assert items["$ref"].endswith("/PatientInput")
+
+
+class TestPredictionBatcher:
+    """Test /predict with the lifespan batcher running"""
+    
+    def test_concurrent_predictions(self, small_model, monkeypatch):
+        """Test concurrent requests each get their own prediction or error"""
+        monkeypatch.setattr(api.main, "model", small_model)
+        
+        patients = [dict(EXAMPLE_PATIENT, current_queue_length=i) for i in range(16)]
+        patients.append(dict(EXAMPLE_PATIENT, department="Unknown"))
+        
+        with TestClient(app) as batch_client:
+            assert api.main._batcher_task is not None
+            
+            with ThreadPoolExecutor(max_workers=len(patients)) as pool:
+                responses = list(pool.map(
+                    lambda patient: batch_client.post("/predict", json=patient), patients
+                ))
+        
+        # Compare against the DataFrame path, which bypasses the batcher and the cache
+        expected = small_model.predict_wait_time_batch(pd.DataFrame(patients[:-1]))
+        
+        for prediction, response in zip(expected, responses[:-1]):
+            assert response.status_code == 200
+            assert response.json()["predicted_wait_time_minutes"] == pytest.approx(prediction, abs=0.01)
+        
+        # Unseen labels are rejected before reaching the batcher
+        assert responses[-1].status_code == 500
+        assert "unseen labels" in responses[-1].json()["detail"]
+    
+    def test_failed_batch(self, small_model, monkeypatch):
+        """Test a failing model call fails its batch and the batcher keeps running"""
+        monkeypatch.setattr(api.main, "model", small_model)
+        predict_array = small_model._predict_array
+        calls = []
+        
+        def fail_first_call(X):
+            calls.append(len(X))
+            if len(calls) == 1:
+                raise RuntimeError("model failure")
+            return predict_array(X)
+        
+        monkeypatch.setattr(small_model, "_predict_array", fail_first_call)
+        
+        with TestClient(app) as batch_client:
+            failed = batch_client.post("/predict", json=dict(EXAMPLE_PATIENT, patient_age=101))
+            recovered = batch_client.post("/predict", json=dict(EXAMPLE_PATIENT, patient_age=102))
+        
+        assert failed.status_code == 500
+        assert "model failure" in failed.json()["detail"]
+        assert recovered.status_code == 200
+        assert len(calls) == 2
+    
+    def test_repeated_prediction_hits_cache(self, small_model, monkeypatch):
+        """Test a repeated input is answered from the prediction cache"""
+        monkeypatch.setattr(api.main, "model", small_model)
+        patient = dict(EXAMPLE_PATIENT, patient_age=77)
+        
+        with TestClient(app) as batch_client:
+            first = batch_client.post("/predict", json=patient)
+            hits = small_model.cache_hits
+            second = batch_client.post("/predict", json=patient)
+        
+        assert small_model.cache_hits == hits + 1
+        assert second.json() == first.json()
 
 
 if __name__ == "__main__":
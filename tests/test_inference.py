@@ -0,0 +1,155 @@
+"""
+Unit tests for model inference, persistence and serving helpers
+
+These tests build their own small datasets, so they do not need the data generator.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+
+from models.train_model import HospitalSchedulerModel
+
+
+def make_patients(n, seed=0):
+    """Build a random patient dataset with the training columns"""
+    rng = np.random.default_rng(seed)
+    
+    df = pd.DataFrame({
+        "patient_id": np.arange(n),
+        "arrival_hour": rng.integers(0, 24, n),
+        "day_of_week": rng.choice(["Monday", "Tuesday", "Saturday"], n),
+        "department": rng.choice(["Emergency", "Cardiology", "General"], n),
+        "priority": rng.choice(["Critical", "High", "Medium", "Low"], n),
+        "num_available_doctors": rng.integers(1, 10, n),
+        "num_available_nurses": rng.integers(2, 15, n),
+        "num_available_rooms": rng.integers(1, 20, n),
+        "current_queue_length": rng.integers(0, 40, n),
+        "patient_age": rng.integers(0, 90, n),
+        "is_weekend": rng.integers(0, 2, n),
+        "season": rng.choice(["Winter", "Summer"], n)
+    })
+    df["wait_time_minutes"] = 10 + 2 * df["current_queue_length"] + rng.normal(0, 3, n)
+    
+    return df
+
+
+@pytest.fixture(scope="module")
+def patient_data():
+    """Small random training set (shared, read-only)"""
+    return make_patients(200)
+
+
+@pytest.fixture(scope="module")
+def trained_model(patient_data):
+    """Train a small model once for the module (shared, read-only)"""
+    model = HospitalSchedulerModel(max_iter=20)
+    model.train(patient_data)
+    
+    return model
+
+
+class TestPersistence:
+    """Test saving and loading model directories"""
+    
+    def test_resave_keeps_loaded_model_valid(self, trained_model, patient_data, tmp_path):
+        """Test saving over a directory does not corrupt a model memory-mapped from it"""
+        trained_model.save_model(tmp_path)
+        loaded_model = HospitalSchedulerModel().load_model(tmp_path)
+        expected = loaded_model.predict_wait_time_batch(patient_data.head(50).copy())
+        
+        # Retrain a different model and save it over the same directory
+        retrained_model = HospitalSchedulerModel(max_iter=40)
+        retrained_model.train(make_patients(300, seed=1))
+        retrained_model.save_model(tmp_path)
+        
+        actual = loaded_model.predict_wait_time_batch(patient_data.head(50).copy())
+        np.testing.assert_array_equal(actual, expected)
+        
+        # No temporary files are left behind
+        assert not list(tmp_path.glob("*.tmp"))
+    
+    def test_onnx_matches_sklearn(self, trained_model, patient_data, tmp_path):
+        """Test the ONNX Runtime serving path predicts the same as sklearn"""
+        pytest.importorskip("skl2onnx")
+        pytest.importorskip("onnxruntime")
+        
+        trained_model.save_model(tmp_path)
+        if not (tmp_path / 'wait_time.onnx').exists():
+            pytest.skip("ONNX conversion failed for this model")
+        
+        onnx_model = HospitalSchedulerModel().load_model(tmp_path)
+        assert onnx_model.ort_sess is not None
+        
+        expected = trained_model.predict_wait_time_batch(patient_data.head(50).copy())
+        actual = onnx_model.predict_wait_time_batch(patient_data.head(50).copy())
+        
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-3)
+    
+    def test_shared_memory_attach(self, trained_model, patient_data, tmp_path):
+        """Test loaded models use exported shared memory only for the same model"""
+        trained_model.save_model(tmp_path)
+        shm = trained_model.export_to_shm(f"hospital_scheduler_test_{os.getpid()}", tmp_path)
+        
+        try:
+            shared_model = HospitalSchedulerModel().load_model(tmp_path)
+            assert shared_model._shm is not None
+            
+            expected = trained_model.predict_wait_time_batch(patient_data.head(50).copy())
+            actual = shared_model.predict_wait_time_batch(patient_data.head(50).copy())
+            np.testing.assert_allclose(actual, expected)
+            
+            # A re-saved model must not pick up the old segment
+            trained_model.save_model(tmp_path)
+            pkl = tmp_path / 'wait_time_model.pkl'
+            os.utime(pkl, ns=(pkl.stat().st_atime_ns, pkl.stat().st_mtime_ns + 10**9))
+            
+            assert HospitalSchedulerModel().load_model(tmp_path)._shm is None
+        finally:
+            trained_model.release_shm(shm, tmp_path)
+    
+    def test_save_load_directory(self, trained_model, patient_data, tmp_path):
+        """Test the on-disk model directory round trip used in production"""
+        trained_model.save_model(tmp_path)
+        
+        loaded_model = HospitalSchedulerModel().load_model(tmp_path)
+        
+        assert loaded_model.feature_columns == trained_model.feature_columns
+        assert loaded_model.metrics == trained_model.metrics
+        
+        expected = trained_model.predict_wait_time_batch(patient_data.head(50).copy())
+        actual = loaded_model.predict_wait_time_batch(patient_data.head(50).copy())
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-3)
+
+
+class TestPreprocessing:
+    """Test preprocessing of training data"""
+    
+    def test_categorical_columns_match_string_columns(self, patient_data):
+        """Test pandas categorical columns encode like plain string columns"""
+        categorical_data = patient_data.copy()
+        for col in ['day_of_week', 'department', 'priority', 'season']:
+            # Declare an unused category that sorts before every real label
+            categories = ['Aaa'] + sorted(patient_data[col].unique())
+            categorical_data[col] = pd.Categorical(patient_data[col], categories=categories)
+        
+        string_model = HospitalSchedulerModel()
+        categorical_model = HospitalSchedulerModel()
+        
+        expected = string_model.preprocess_data(patient_data)
+        actual = categorical_model.preprocess_data(categorical_data)
+        
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        for col, encoder in string_model.label_encoders.items():
+            assert list(categorical_model.label_encoders[col].classes_) == list(encoder.classes_)
+        
+        # The unused category was never learned, so it is still unseen at inference
+        unseen = categorical_data.head(5).copy()
+        unseen['department'] = pd.Categorical(['Aaa'] * 5)
+        with pytest.raises(ValueError):
+            categorical_model.preprocess_data(unseen)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,17 +3,24 @@ Unit tests for the Hospital Scheduler ML Model
 """
 
 import pytest
+import io
 import pandas as pd
 import numpy as np
-from pathlib import Path
-import sys
-
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+import os
 
 from models.train_model import HospitalSchedulerModel
 from data.generate_data import HospitalDataGenerator
 
+# Sample size for the shared training data (the full-size run is marked slow)
+TEST_SAMPLES = int(os.environ.get("HOSPITAL_TEST_SAMPLES", 200))
+
+
+@pytest.fixture(scope="session")
+def sample_data():
+    """Create sample data for testing (shared, read-only)"""
+    generator = HospitalDataGenerator(num_samples=TEST_SAMPLES)
+    return generator.generate_dataset()
+
 
 class TestDataGenerator:
     """Test the data generator"""
@@ -27,11 +34,10 @@ class TestDataGenerator:
         assert 'wait_time_minutes' in df.columns
         assert 'department' in df.columns
         assert df['wait_time_minutes'].min() >= 5
-        
-    def test_wait_time_calculation(self):
+    
+    def test_wait_time_calculation(self, sample_data):
         """Test wait time calculation logic"""
-        generator = HospitalDataGenerator(num_samples=100)
-        df = generator.generate_dataset()
+        df = sample_data
         
         # Critical patients should generally have lower wait times
         critical = df[df['priority'] == 'Critical']['wait_time_minutes'].mean()
@@ -43,33 +49,35 @@ class TestDataGenerator:
 class TestMLModel:
     """Test the ML model"""
     
-    @pytest.fixture
-    def sample_data(self):
-        """Create sample data for testing"""
-        generator = HospitalDataGenerator(num_samples=1000)
-        return generator.generate_dataset()
-    
-    @pytest.fixture
-    def trained_model(self, sample_data, tmp_path):
-        """Train a model for testing"""
-        # Save sample data
-        data_path = tmp_path / "test_data.csv"
-        sample_data.to_csv(data_path, index=False)
-        
-        # Train model
-        model = HospitalSchedulerModel()
-        model.train(str(data_path), test_size=0.2)
+    @pytest.fixture(scope="session")
+    def trained_model(self, sample_data):
+        """Train a model once for all tests (shared, read-only)"""
+        # Train model (fewer boosting iterations keep the fixture cheap)
+        model = HospitalSchedulerModel(max_iter=50)
+        model.train(sample_data, test_size=0.2)
         
         return model
     
-    def test_model_training(self, trained_model):
-        """Test that model trains successfully"""
+    @pytest.mark.parametrize("check", ["training", "prediction", "save_load", "importance"])
+    def test_trained_model(self, trained_model, check):
+        """Run one check against the shared trained model"""
+        checks = {
+            "training": self.check_model_training,
+            "prediction": self.check_prediction,
+            "save_load": self.check_save_load_model,
+            "importance": self.check_feature_importance
+        }
+        
+        checks[check](trained_model)
+    
+    def check_model_training(self, trained_model):
+        """Check that model trains successfully"""
         assert trained_model.wait_time_model is not None
         assert 'wait_time' in trained_model.metrics
         assert trained_model.metrics['wait_time']['test_r2'] > 0
     
-    def test_prediction(self, trained_model):
-        """Test model prediction"""
+    def check_prediction(self, trained_model):
+        """Check model prediction"""
         test_input = {
             'arrival_hour': 14,
             'day_of_week': 'Monday',
@@ -89,30 +97,46 @@ class TestMLModel:
         assert isinstance(prediction, (int, float, np.number))
         assert prediction > 0
         assert prediction < 500  # Reasonable upper bound
+        
+        # Repeated inputs are served from the prediction cache
+        hits = trained_model.cache_hits
+        assert trained_model.predict_wait_time(test_input) == prediction
+        assert trained_model.cache_hits == hits + 1
     
-    def test_save_load_model(self, trained_model, tmp_path):
-        """Test model saving and loading"""
-        model_dir = tmp_path / "models"
-        model_dir.mkdir()
+    def check_save_load_model(self, trained_model):
+        """Check model saving and loading"""
+        buf = io.BytesIO()
         
         # Save model
-        trained_model.save_model(str(model_dir))
+        trained_model.save_model(buf)
+        buf.seek(0)
         
         # Load model
         new_model = HospitalSchedulerModel()
-        new_model.load_model(str(model_dir))
+        new_model.load_model(buf)
         
         assert new_model.wait_time_model is not None
         assert new_model.feature_columns == trained_model.feature_columns
     
-    def test_feature_importance(self, trained_model):
-        """Test feature importance extraction"""
+    def check_feature_importance(self, trained_model):
+        """Check feature importance extraction"""
         importance = trained_model.get_feature_importance(trained_model.feature_columns)
         
         assert importance is not None
         assert len(importance) > 0
         assert 'feature' in importance.columns
         assert 'importance' in importance.columns
+    
+    @pytest.mark.slow
+    def test_model_training_full_size(self):
+        """Test training on the full 1000-sample dataset"""
+        generator = HospitalDataGenerator(num_samples=1000)
+        
+        model = HospitalSchedulerModel()
+        model.train(generator.generate_dataset(), test_size=0.2)
+        
+        assert model.wait_time_model is not None
+        assert model.metrics['wait_time']['test_r2'] > 0
 
 
 if __name__ == "__main__":